@@ -1,6 +1,8 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
-import plotly.express as px
+import plotly.graph_objects as go
+from pathlib import Path
 
 # --------------------------------
 # PAGE SETUP
@@ -15,32 +17,213 @@ st.set_page_config(
 # --------------------------------
 CHART_HEIGHT = 450  # all charts same height
 
+def build_chart(counts, title, xaxis_title, color, line=False):
+    # Shared layout for every chart; a bar chart unless line=True
+    if line:
+        trace = go.Scatter(
+            x=counts.index.to_numpy(),
+            y=counts.to_numpy(),
+            mode="lines+markers",
+            line_color=color,
+            marker_color=color
+        )
+    else:
+        trace = go.Bar(
+            x=counts.index.to_numpy(),
+            y=counts.to_numpy(),
+            marker_color=color
+        )
+    fig = go.Figure(trace)
+    fig.update_layout(
+        title=title,
+        height=CHART_HEIGHT,
+        xaxis_title=xaxis_title,
+        yaxis_title="Leads",
+        xaxis_tickangle=-45,
+        margin=dict(l=40, r=40, t=60, b=80)
+    )
+    return fig
+
 # --------------------------------
 # LOAD DATA
 # --------------------------------
+CSV_PATH = Path("cleaned_digital_dealer.csv")
+PARQUET_PATH = Path("cleaned_digital_dealer.parquet")
+
+# Stored in the Parquet metadata; bump whenever load_data() changes the
+# prepared frame so copies written by an older loader are rebuilt
+LOADER_VERSION = 1
+
+# Categorical filter / groupby columns, with Arrow-backed string categories
+CATEGORY_COLS = ["Dealer", "STATE", "Location_clean", "Form_clean"]
+
+# Only the columns the dashboard uses are read; Location and Form are optional
+LOAD_COLS = ["Lead_Date", "Week_Start", "Dealer/Website", "STATE", "Location", "Form"]
+
+@st.cache_data(show_spinner=False)
 def load_data():
+    # Parquet copy of the cleaned frame; rebuilt whenever the CSV is newer
+    # or the copy was written by another loader version
+    if PARQUET_PATH.exists() and PARQUET_PATH.stat().st_mtime >= CSV_PATH.stat().st_mtime:
+        try:
+            cached = pd.read_parquet(PARQUET_PATH)
+        except (OSError, ValueError):
+            cached = None
+        if cached is not None and cached.attrs.get("loader_version") == LOADER_VERSION:
+            # Parquet reads categories back as pandas' default string dtype
+            for col in CATEGORY_COLS:
+                if col in cached.columns:
+                    categories = cached[col].cat.categories.astype("string[pyarrow]")
+                    cached[col] = cached[col].astype(pd.CategoricalDtype(categories))
+            return cached
+
+    # The pyarrow engine needs usecols as a list of columns that exist
+    header = pd.read_csv(CSV_PATH, nrows=0).columns
     df = pd.read_csv(
-        "cleaned_digital_dealer.csv",
+        CSV_PATH,
+        engine="pyarrow",
+        usecols=[c for c in LOAD_COLS if c in header],
         parse_dates=["Lead_Date", "Week_Start"]
     )
     df = df.rename(columns={"Dealer/Website": "Dealer"})
+
+    # ----- Clean location -----
+    if "Location" in df.columns:
+        # Arrow-backed strings run the regex/strip/title kernels in C++;
+        # missing locations stay missing instead of becoming "Nan"
+        df["Location_clean"] = (
+            df["Location"]
+            .astype("string[pyarrow]")
+            .str.replace(r"\s+", " ", regex=True)
+            .str.strip()
+            .str.title()
+        )
+    else:
+        df["Location_clean"] = ""
+
+    # ----- Clean form -----
+    if "Form" in df.columns:
+        df["Form_clean"] = df["Form"].fillna("Unknown")
+
+    # ----- Categorical filter / groupby columns -----
+    # Categories are Arrow-backed strings rather than Python objects
+    for col in CATEGORY_COLS:
+        if col in df.columns:
+            df[col] = df[col].astype("string[pyarrow]").astype("category")
+
+    # The raw text columns are only inputs to the cleaned ones above
+    df = df.drop(columns=["Location", "Form"], errors="ignore")
+
+    # Sorted by date so a date range is a contiguous row slice
+    df = df.sort_values("Lead_Date", ignore_index=True)
+
+    # Written to a temp file and renamed, so a partial write is never read
+    # back; a read-only directory just means no Parquet copy
+    df.attrs["loader_version"] = LOADER_VERSION
+    tmp_path = PARQUET_PATH.with_name(PARQUET_PATH.name + ".tmp")
+    try:
+        df.to_parquet(tmp_path)
+        tmp_path.replace(PARQUET_PATH)
+    except OSError:
+        tmp_path.unlink(missing_ok=True)
     return df
 
-df = load_data()
+# Columns each chart counts leads by
+COUNT_COLS = ["Week_Start", "Dealer", "Location_clean", "STATE", "Form_clean"]
+
+@st.cache_data(show_spinner=False)
+def load_daily_counts():
+    # Leads per day, and per day x value for every chart column.
+    # Summing a date range of these rows gives the unfiltered chart counts.
+    df = load_data()
+    tables = {"Lead_Date": df.groupby("Lead_Date").size().astype("int32")}
+    for col in COUNT_COLS:
+        if col in df.columns:
+            tables[col] = (
+                df.groupby(["Lead_Date", col], observed=True).size()
+                .unstack(fill_value=0)
+                .astype("int32")
+            )
+    return tables
+
+@st.cache_data(show_spinner=False)
+def load_state_locations():
+    # Location_clean values seen under each state, for the Location list
+    df = load_data()
+    return {
+        state: frozenset(group["Location_clean"].dropna())
+        for state, group in df.groupby("STATE", observed=True)
+    }
+
+def isin_categories(col, values):
+    # Membership test on a categorical column's integer codes
+    wanted = col.cat.categories.get_indexer(values)
+    return np.isin(col.cat.codes.to_numpy(), wanted[wanted >= 0])
+
+def filter_key(col, selected, select_all):
+    # None when the selection keeps every row, so no mask is built for it
+    if select_all:
+        return None
+    if len(selected) == len(col.cat.categories) and not col.hasnans:
+        return None
+    return tuple(selected)
+
+def count_categories(col):
+    # Leads per category via bincount over the integer codes (-1 = missing)
+    codes = col.cat.codes.to_numpy()
+    counts = np.bincount(codes[codes >= 0], minlength=len(col.cat.categories)).astype(np.int32)
+    return pd.Series(counts, index=col.cat.categories)
+
+@st.cache_data(show_spinner=False)
+def count_leads(start_date, end_date, states_key, locations_key, forms_key):
+    # Lead counts per day and per chart column for one filter selection;
+    # a key of None means that filter is on "Select All"
+    start_ts = np.datetime64(start_date, "ns")
+    end_ts = np.datetime64(end_date, "ns")
+
+    if states_key is None and locations_key is None and forms_key is None:
+        # Only the date range applies: sum the precomputed per-day tables
+        daily_counts = load_daily_counts()
+        lead_counts = {"Lead_Date": daily_counts["Lead_Date"].loc[start_ts:end_ts]}
+        for col, table in daily_counts.items():
+            if col != "Lead_Date":
+                col_counts = table.loc[start_ts:end_ts].sum()
+                lead_counts[col] = col_counts[col_counts > 0]
+        return lead_counts
+
+    df = load_data()
+    lead_dates = df["Lead_Date"].to_numpy()
+    lo = np.searchsorted(lead_dates, start_ts, side="left")
+    hi = np.searchsorted(lead_dates, end_ts, side="right")
+    date_slice = df.iloc[lo:hi]
+
+    # One combined mask over the date slice, applied in a single gather
+    masks = []
+
+    if states_key is not None:
+        masks.append(isin_categories(date_slice["STATE"], states_key))
+
+    if locations_key is not None:
+        masks.append(isin_categories(date_slice["Location_clean"], locations_key))
+
+    if forms_key is not None:
+        masks.append(isin_categories(date_slice["Form_clean"], forms_key))
+
+    filtered = date_slice.iloc[np.flatnonzero(np.logical_and.reduce(masks))]
+
+    # Charts pick their own top-N, so counts are left unsorted; categoricals
+    # count every category, and the unused ones are dropped here
+    lead_counts = {"Lead_Date": filtered["Lead_Date"].value_counts(sort=False)}
+    for col in COUNT_COLS:
+        if col in filtered.columns:
+            if isinstance(filtered[col].dtype, pd.CategoricalDtype):
+                col_counts = count_categories(filtered[col])
+            else:
+                col_counts = filtered[col].value_counts(sort=False)
+            lead_counts[col] = col_counts[col_counts > 0]
+    return lead_counts
 
-# --------------------------------
-# CLEAN LOCATION
-# --------------------------------
-if "Location" in df.columns:
-    df["Location_clean"] = (
-        df["Location"]
-        .astype(str)
-        .str.strip()
-        .str.replace(r"\s+", " ", regex=True)
-        .str.title()
-    )
-else:
-    df["Location_clean"] = ""
+df = load_data()
 
 # --------------------------------
 # REQUIRED COLUMNS CHECK
@@ -92,7 +275,8 @@ else:
     st.sidebar.info(f"{start_date} → {end_date}")
 
 # ----- State filter -----
-states = sorted(df["STATE"].dropna().unique())
+# Categories are already the sorted unique non-null values
+states = df["STATE"].cat.categories.tolist()
 select_all_states = st.sidebar.checkbox("Select All States", value=True)
 
 if select_all_states:
@@ -105,8 +289,13 @@ else:
     )
 
 # ----- Location filter -----
-df_for_locations = df if select_all_states else df[df["STATE"].isin(selected_states)]
-all_locations = sorted(df_for_locations["Location_clean"].dropna().unique())
+if select_all_states:
+    all_locations = df["Location_clean"].cat.categories.tolist()
+else:
+    state_locations = load_state_locations()
+    all_locations = sorted(
+        frozenset().union(*(state_locations.get(s, ()) for s in selected_states))
+    )
 
 select_all_locations = st.sidebar.checkbox("Select All Locations", value=True)
 
@@ -126,8 +315,8 @@ else:
 select_all_forms = True
 selected_forms = None
 
-if "Form" in df.columns:
-    forms = sorted(df["Form"].fillna("Unknown").unique())
+if "Form_clean" in df.columns:
+    forms = df["Form_clean"].cat.categories.tolist()
 
     select_all_forms = st.sidebar.checkbox("Select All Forms", value=True)
 
@@ -145,40 +334,31 @@ else:
     selected_forms = None
 
 # --------------------------------
-# APPLY FILTERS
+# APPLY FILTERS + COUNT LEADS
 # --------------------------------
-filtered = df.copy()
-
-start_ts = pd.to_datetime(start_date)
-end_ts = pd.to_datetime(end_date)
-
-filtered = filtered[
-    (filtered["Lead_Date"] >= start_ts) &
-    (filtered["Lead_Date"] <= end_ts)
-]
+states_key = filter_key(df["STATE"], selected_states, select_all_states)
+locations_key = filter_key(df["Location_clean"], selected_locations, select_all_locations)
+forms_key = None
+if selected_forms is not None:
+    forms_key = filter_key(df["Form_clean"], selected_forms, select_all_forms)
 
-if not select_all_states:
-    filtered = filtered[filtered["STATE"].isin(selected_states)]
-
-if not select_all_locations:
-    filtered = filtered[filtered["Location_clean"].isin(selected_locations)]
-
-if (selected_forms is not None) and (not select_all_forms):
-    filtered = filtered[filtered["Form"].fillna("Unknown").isin(selected_forms)]
+lead_counts = count_leads(start_date, end_date, states_key, locations_key, forms_key)
 
 # --------------------------------
 # KPI ROW
 # --------------------------------
-if not filtered.empty:
-    total_leads = len(filtered)
+day_counts = lead_counts["Lead_Date"]
+total_leads = int(day_counts.sum())
+
+if total_leads > 0:
     date_span_days = (
-        filtered["Lead_Date"].max().date()
-        - filtered["Lead_Date"].min().date()
+        day_counts.index.max().date()
+        - day_counts.index.min().date()
     ).days + 1
     avg_leads_per_day = total_leads / date_span_days if date_span_days > 0 else 0
-    num_dealers = filtered["Dealer"].nunique()
+    num_dealers = len(lead_counts["Dealer"])
 else:
-    total_leads = avg_leads_per_day = num_dealers = 0
+    avg_leads_per_day = num_dealers = 0
 
 kpi1, kpi2, kpi3 = st.columns(3)
 
@@ -191,125 +371,41 @@ st.markdown("---")
 # --------------------------------
 # MAIN CONTENT
 # --------------------------------
-if not filtered.empty:
+if total_leads > 0:
 
     # ---------- 1. Weekly Leads Line Chart ----------
-    weekly_counts = (
-        filtered
-        .groupby("Week_Start").size()
-        .reset_index(name="Leads")
-        .sort_values("Week_Start")
-    )
+    weekly_counts = lead_counts["Week_Start"].sort_index()
 
-    fig_week = px.line(
-        weekly_counts,
-        x="Week_Start",
-        y="Leads",
-        markers=True,
-        title="Leads Over Time (Weekly)",
-        height=CHART_HEIGHT
-    )
-    fig_week.update_traces(line_color="#324AB2", marker_color="#324AB2")
-    fig_week.update_layout(
-        xaxis_title="Week",
-        xaxis_tickangle=-45,
-        margin=dict(l=40, r=40, t=60, b=80)
+    fig_week = build_chart(
+        weekly_counts, "Leads Over Time (Weekly)", "Week", "#324AB2", line=True
     )
     st.plotly_chart(fig_week, use_container_width=True)
 
     # ---------- 2. Individual Dealer ----------
-    dealer_counts = (
-        filtered
-        .groupby("Dealer").size()
-        .reset_index(name="Leads")
-        .sort_values("Leads", ascending=False)
-    )
+    dealer_counts = lead_counts["Dealer"].nlargest(15)
 
-    fig_dealer = px.bar(
-        dealer_counts.head(15),
-        x="Dealer",
-        y="Leads",
-        title="Leads by Website",
-        height=CHART_HEIGHT
-    )
-    fig_dealer.update_traces(marker_color="#0073CF")
-    fig_dealer.update_layout(
-        xaxis_title="Dealer Website",
-        xaxis_tickangle=-45,
-        margin=dict(l=40, r=40, t=60, b=80)
-    )
+    fig_dealer = build_chart(dealer_counts, "Leads by Website", "Dealer Website", "#0073CF")
     st.plotly_chart(fig_dealer, use_container_width=True)
 
     # ---------- 3. Specific Locations ----------
-    location_counts = (
-        filtered
-        .groupby("Location_clean").size()
-        .reset_index(name="Leads")
-        .sort_values("Leads", ascending=False)
-    )
+    location_counts = lead_counts["Location_clean"].nlargest(25)
 
-    fig_location = px.bar(
-        location_counts.head(25),
-        x="Location_clean",
-        y="Leads",
-        title="Leads by Individual Dealer",
-        height=CHART_HEIGHT
-    )
-    fig_location.update_traces(marker_color="#3E8EDE")
-    fig_location.update_layout(
-        xaxis_title="Specific Dealers",
-        xaxis_tickangle=-45,
-        margin=dict(l=40, r=40, t=60, b=80)
+    fig_location = build_chart(
+        location_counts, "Leads by Individual Dealer", "Specific Dealers", "#3E8EDE"
     )
     st.plotly_chart(fig_location, use_container_width=True)
 
     # ---------- 4. Leads by State ----------
-    state_counts = (
-        filtered
-        .groupby("STATE").size()
-        .reset_index(name="Leads")
-        .sort_values("Leads", ascending=False)
-    )
+    state_counts = lead_counts["STATE"].sort_values(ascending=False, kind="stable")
 
-    fig_state = px.bar(
-        state_counts,
-        x="STATE",
-        y="Leads",
-        title="Leads by State",
-        height=CHART_HEIGHT
-    )
-    fig_state.update_traces(marker_color="#76c7ff")
-    fig_state.update_layout(
-        xaxis_title="State",
-        xaxis_tickangle=-45,
-        margin=dict(l=40, r=40, t=60, b=80)
-    )
+    fig_state = build_chart(state_counts, "Leads by State", "State", "#76c7ff")
     st.plotly_chart(fig_state, use_container_width=True)
 
     # ---------- 5. Leads by Form ----------
-    if "Form" in filtered.columns:
-        form_counts = (
-            filtered
-            .assign(Form_clean=filtered["Form"].fillna("Unknown"))
-            .groupby("Form_clean")
-            .size()
-            .reset_index(name="Leads")
-            .sort_values("Leads", ascending=False)
-        )
+    if "Form_clean" in lead_counts:
+        form_counts = lead_counts["Form_clean"].nlargest(15)    # top 15 forms
 
-        fig_form = px.bar(
-            form_counts.head(15),           # top 15 forms
-            x="Form_clean",
-            y="Leads",
-            title="Leads by Form Type",
-            height=CHART_HEIGHT
-        )
-        fig_form.update_traces(marker_color="#FF8C42")
-        fig_form.update_layout(
-            xaxis_title="Form",
-            xaxis_tickangle=-45,
-            margin=dict(l=40, r=40, t=60, b=80)
-        )
+        fig_form = build_chart(form_counts, "Leads by Form Type", "Form", "#FF8C42")
         st.plotly_chart(fig_form, use_container_width=True)
     else:
         st.info("Column 'Form' not found in data; cannot plot Leads by Form.")